@@ -4,7 +4,6 @@ import asyncio
 import base64
 import json
 import os
-import queue
 import re
 import sys
 import tempfile
@@ -42,6 +41,11 @@ try:
 except Exception:
 	OWWModel = None  # type: ignore
 
+try:
+	from numba import njit  # type: ignore
+except Exception:
+	njit = None  # type: ignore
+
 load_dotenv()
 
 
@@ -63,15 +67,66 @@ SAMPLE_RATE = 24000
 FORMAT = np.int16
 CHANNELS = 1
 ENERGY_THRESHOLD = 0.015
-PREBUFFER_CHUNKS = 3
+PREBUFFER_MS = 120  # assistant audio buffered before playback (re)starts
+PREBUFFER_MAX_MS = 500  # ceiling for the prebuffer as it grows after underruns
+PREBUFFER_DECAY_REPLIES = 3  # underrun-free replies before the prebuffer shrinks a step
+UNDERRUN_RAMP_SAMPLES = 64  # ramp to silence when playback runs dry mid-response
+# Output callback period. Larger blocks ride out OS scheduling jitter better;
+# Windows has no realtime audio scheduling by default, so give it more room.
+AUDIO_BLOCKSIZE_MS = float(
+	os.environ.get("AUDIO_BLOCKSIZE_MS") or (60 if sys.platform == "win32" else 40)
+)
+AUDIO_SLAB_S = 30  # seconds of assistant audio the preallocated playback arena holds
+OUTPUT_RING_SLOTS = 4096  # power of two; assistant audio chunks queued for playback
 FADE_OUT_MS = 12
+MIC_RING_SLOTS = 64  # power of two; captured mic blocks awaiting capture_audio
+MIC_SEND_QUEUE_MAX = 16  # audio sends waiting on the WebSocket before we drop the oldest
+MIC_SEND_BATCH_FRAMES = 3  # mic frames per send when no barge-in is at stake
 # Barge-in robustness
-BARGE_IN_FRAMES_REQUIRED = 4  # consecutive frames above threshold while assistant speaks
+# While the assistant speaks, barge in once this many of the last
+# BARGE_IN_WINDOW_FRAMES mic frames clear the echo guard. A window instead of a
+# strict run means one dip mid-word doesn't restart the count.
+BARGE_IN_WINDOW_FRAMES = 6
+BARGE_IN_FRAMES_REQUIRED = 4
 ECHO_SUPPRESS_MULTIPLIER = 1.8  # mic must exceed playback RMS by this factor
 # End-of-utterance detection (rms mode) and server VAD config
 DEFAULT_SILENCE_MS = 750  # silence after speech that ends a user turn
 MIN_UTTERANCE_MS = 300  # minimum speech length before we'll commit a turn
 
+
+# Energy gates compare mean squares in raw int16 units, so no sqrt is needed:
+# rms >= t  <=>  sum(x*x) >= (t * 32768)**2 * n. Mean squares are kept as Q16
+# integers and the squared echo multiplier as Q8, so the gates are integer-only.
+_ENERGY_THRESHOLD_MS_Q16 = int((ENERGY_THRESHOLD * 32768.0) ** 2 * 65536)
+_ECHO_SUPPRESS_GAIN_Q8 = round(ECHO_SUPPRESS_MULTIPLIER**2 * 256)
+_BARGE_IN_WINDOW_MASK = (1 << BARGE_IN_WINDOW_FRAMES) - 1
+
+
+def _ssq_i16(samples: np.ndarray) -> int:
+	"""Sum of squares of int16 PCM, accumulated in int64 in a single pass."""
+	flat = samples.reshape(-1)
+	return int(np.einsum("i,i->", flat, flat, dtype=np.int64))
+
+
+def _fade_into_i16(src, start, gain_q15, dst, n):
+	"""dst[:n] = src[start:start+n] * gain_q15[:n] >> 15, in one integer pass.
+
+	Gains are Q15 in [0, 32767], so the product always fits int16 again and
+	needs no clipping.
+	"""
+	for i in range(n):
+		dst[i] = np.int16((np.int32(src[start + i]) * np.int32(gain_q15[i])) >> 15)
+	return n
+
+
+# With numba installed the fade kernel runs as a single compiled loop on the
+# audio thread; otherwise _render_fade_ramp falls back to NumPy.
+_fade_into_i16_jit = (
+	njit(cache=True, fastmath=True, boundscheck=False)(_fade_into_i16)
+	if njit is not None
+	else None
+)
+
 # xAI Voice Agent API
 XAI_REALTIME_URL = "wss://api.x.ai/v1/realtime"
 DEFAULT_MODEL = "grok-voice-think-fast-1.0"
@@ -591,6 +646,63 @@ def _build_tools(
 	}
 
 
+class SpscRing:
+	"""Lock-free single-producer/single-consumer ring of Python objects.
+
+	Safe for exactly one producer thread and one consumer thread: each index is
+	written by only one side, and CPython int/list stores are atomic under the
+	GIL. The slot is filled before ``_tail`` is published, so the consumer never
+	sees a half-written entry. Capacity must be a power of two.
+	"""
+
+	def __init__(self, capacity: int) -> None:
+		if capacity <= 0 or capacity & (capacity - 1):
+			raise ValueError("capacity must be a power of two")
+		self._slots: list[Any] = [None] * capacity
+		self._mask = capacity - 1
+		self._head = 0  # consumer-owned
+		self._tail = 0  # producer-owned
+
+	def __len__(self) -> int:
+		return self._tail - self._head
+
+	def empty(self) -> bool:
+		return self._head == self._tail
+
+	def push(self, item: Any) -> bool:
+		"""Producer side. Returns False (dropping the item) when full."""
+		tail = self._tail
+		if tail - self._head > self._mask:
+			return False
+		self._slots[tail & self._mask] = item
+		self._tail = tail + 1
+		return True
+
+	def pop(self) -> Any:
+		"""Consumer side. Returns None when empty."""
+		head = self._head
+		if head == self._tail:
+			return None
+		idx = head & self._mask
+		item = self._slots[idx]
+		self._slots[idx] = None
+		self._head = head + 1
+		return item
+
+	def clear(self) -> Any:
+		"""Consumer side. Drops everything queued in O(1) and returns the newest
+		dropped item (None when already empty).
+
+		Dropped slots keep their references until the producer overwrites them.
+		"""
+		tail = self._tail
+		if tail == self._head:
+			return None
+		newest = self._slots[(tail - 1) & self._mask]
+		self._head = tail
+		return newest
+
+
 class YuiRealtime:
 	def __init__(
 		self,
@@ -604,6 +716,8 @@ class YuiRealtime:
 		sleep_after_s: float = DEFAULT_SLEEP_AFTER_S,
 		greet_on_wake: bool = True,
 		silence_ms: int = DEFAULT_SILENCE_MS,
+		block_ms: float = AUDIO_BLOCKSIZE_MS,
+		prebuffer_ms: float = PREBUFFER_MS,
 	) -> None:
 		self.memory = memory
 
@@ -648,26 +762,94 @@ class YuiRealtime:
 		self.audio_stream: Optional["sd.InputStream"] = None
 		self.audio_player: Optional["sd.OutputStream"] = None
 		self.recording = False
-
-		# Output queue: (samples_np, item_id, content_index)
-		self.output_queue: queue.Queue[Any] = queue.Queue(maxsize=0)
+		# Mic blocks pushed by the input callback; _mic_event wakes capture_audio.
+		self._mic_ring = SpscRing(MIC_RING_SLOTS)
+		self._mic_event = asyncio.Event()
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+		# Output ring: (samples_np, item_id, content_index, slab_release,
+		# queued_mark). Filled by _on_event, drained by the realtime output
+		# callback — never take a lock between them. The two marks are the
+		# producer's cursors after this chunk, so the consumer can catch up to
+		# any chunk (or drop the whole ring) with plain stores.
+		self.output_queue = SpscRing(OUTPUT_RING_SLOTS)
+		self._output_overflow_warned = False
 		self.interrupt_event = threading.Event()
-		self.current_audio_chunk: Optional[tuple[np.ndarray, str, int]] = None
+		self.current_audio_chunk: Optional[tuple[np.ndarray, str, int, int, int]] = None
+		# Playback arena. Incoming audio is copied once into this slab (bump
+		# allocation with wraparound) and the ring carries views into it. Both
+		# cursors count samples ever allocated/released, and each has a single
+		# writer, so the live region is simply _slab_alloc - _slab_freed.
+		self._audio_slab = np.empty(SAMPLE_RATE * AUDIO_SLAB_S, dtype=np.int16)
+		self._slab_alloc = 0  # producer-owned (_enqueue_audio)
+		self._slab_freed = 0  # consumer-owned (output callback)
+		# Samples sitting in output_queue = _queued_samples - _dequeued_samples.
+		self._queued_samples = 0  # producer-owned
+		self._dequeued_samples = 0  # consumer-owned
 		self.chunk_position = 0
 		self.bytes_per_sample = np.dtype(FORMAT).itemsize
+		# Validated once here so the callbacks can run unguarded: the Q15 fade,
+		# integer energy math, and playback arena all assume int16 PCM.
+		if self.bytes_per_sample != 2:
+			raise ValueError(f"FORMAT must be 16-bit PCM, got {np.dtype(FORMAT)}")
 
 		# Jitter buffer and fade-out state
 		self.prebuffering = True
-		self.prebuffer_target_chunks = PREBUFFER_CHUNKS
+		self._prebuffer_target_samples = max(0, int(SAMPLE_RATE * (prebuffer_ms / 1000.0)))
+		self._prebuffer_base_samples = self._prebuffer_target_samples
+		self._prebuffer_max_samples = max(
+			self._prebuffer_target_samples, int(SAMPLE_RATE * (PREBUFFER_MAX_MS / 1000.0))
+		)
+		# Adaptive prebuffer bookkeeping (output callback only): underruns grow
+		# the target, runs of clean replies shrink it back toward the base.
+		self._reply_underran = False
+		self._clean_replies = 0
+		# True while the server is still streaming audio for the current response,
+		# so running dry is a real underrun rather than the end of the reply.
+		self._response_audio_pending = False
+		self._last_sample = 0  # last sample written to the device
 		self.fading = False
 		self.fade_total_samples = 0
 		self.fade_done_samples = 0
 		self.fade_samples = int(SAMPLE_RATE * (FADE_OUT_MS / 1000.0))
 
+		# Realtime-callback scratch, sized once so the audio thread never allocates.
+		# The callback is integer-only, so one shared int32 work buffer covers every
+		# transient product (fade render, underrun ramp); nothing needs float32.
+		self.blocksize = max(1, int(SAMPLE_RATE * (block_ms / 1000.0)))
+		self._buf_i32 = np.empty(
+			max(self.blocksize, self.fade_samples + 1, UNDERRUN_RAMP_SAMPLES), dtype=np.int32
+		)
+		# Fade gain quantized once to Q15 so the fade runs entirely in integers.
+		self._fade_gain_q15 = (
+			np.linspace(1.0, 0.0, self.fade_samples + 1, dtype=np.float32) * 32767
+		).astype(np.int16)
+		self._fade_gain_idx = np.arange(self.fade_samples + 1, dtype=np.int32)
+		self._fade_gain_buf = np.empty(self.fade_samples + 1, dtype=np.int16)
+		# The whole fade-out is rendered once when it starts; callbacks then
+		# just copy successive slices of it.
+		self._ramp_buf_i16 = np.empty(self.fade_samples + 1, dtype=np.int16)
+		if _fade_into_i16_jit is not None:
+			# Compile now (or load from cache) so the first barge-in doesn't JIT
+			# on the audio thread.
+			warmup = np.zeros(1, dtype=np.int16)
+			_fade_into_i16_jit(warmup, 0, self._fade_gain_q15, self._ramp_buf_i16, 1)
+		# Short Q15 ramp that takes the last sample down to silence on underrun.
+		self._underrun_ramp_q15 = (
+			np.linspace(1.0, 0.0, UNDERRUN_RAMP_SAMPLES + 1, dtype=np.float32)[1:] * 32767
+		).astype(np.int16)
+		self._underrun_idx = np.arange(1, UNDERRUN_RAMP_SAMPLES + 1, dtype=np.int32)
+
 		# Echo suppression / VAD state
-		self.recent_playback_rms: float = 0.0
-		self._playback_rms_alpha: float = 0.2
-		self.vad_active_frames: int = 0
+		# Smoothed mean square of speaker output, in int16 units squared.
+		self.recent_playback_ms_q16: int = 0
+		self._playback_ms_shift: int = 3  # EMA weight 1/8 per played block
+		# Last block handed to the speaker. The output callback only stores the
+		# reference; capture_audio folds it into recent_playback_ms_q16 off the
+		# realtime thread.
+		self._last_played: Optional[np.ndarray] = None
+		# Barge-in history: bit k set = the frame k frames ago cleared the guard.
+		self.vad_window: int = 0
 		self.force_barge_in: bool = False
 
 		# Track in-flight assistant response so we can cancel on barge-in
@@ -677,6 +859,15 @@ class YuiRealtime:
 
 		# Async send lock to serialize WebSocket sends
 		self._send_lock = asyncio.Lock()
+		# Mic audio (and turn commits, as None) waiting for the sender task, so
+		# capture never blocks on a stalled WebSocket. Only audio counts toward
+		# MIC_SEND_QUEUE_MAX; commits are never dropped.
+		self._send_q: asyncio.Queue[Any] = asyncio.Queue()
+		self._send_audio_queued = 0
+		self._sender_task: Optional[asyncio.Task[None]] = None
+		self._send_drop_warned = False
+		# Mic frames coalesced into the next send (see _queue_audio).
+		self._mic_batch: list[Any] = []
 
 	# ---------- Audio output callback ----------
 
@@ -686,13 +877,9 @@ class YuiRealtime:
 
 		# Interruption with fade-out
 		if self.interrupt_event.is_set():
-			outdata.fill(0)
 			if self.current_audio_chunk is None:
-				while not self.output_queue.empty():
-					try:
-						self.output_queue.get_nowait()
-					except queue.Empty:
-						break
+				outdata.fill(0)
+				self._drop_queued_audio()
 				self.prebuffering = True
 				self.interrupt_event.clear()
 				return
@@ -702,8 +889,10 @@ class YuiRealtime:
 				self.fade_done_samples = 0
 				remaining_in_chunk = len(self.current_audio_chunk[0]) - self.chunk_position
 				self.fade_total_samples = min(self.fade_samples, max(0, remaining_in_chunk))
+				self._render_fade_ramp(
+					self.current_audio_chunk[0], self.chunk_position, self.fade_total_samples
+				)
 
-			samples, item_id, content_index = self.current_audio_chunk
 			samples_filled = 0
 			while (
 				samples_filled < len(outdata) and self.fade_done_samples < self.fade_total_samples
@@ -712,59 +901,45 @@ class YuiRealtime:
 				remaining_fade = self.fade_total_samples - self.fade_done_samples
 				n = min(remaining_output, remaining_fade)
 
-				src = samples[self.chunk_position : self.chunk_position + n].astype(np.float32)
-				idx = np.arange(
-					self.fade_done_samples, self.fade_done_samples + n, dtype=np.float32
-				)
-				gain = 1.0 - (idx / float(self.fade_total_samples))
-				ramped = np.clip(src * gain, -32768.0, 32767.0).astype(np.int16)
+				ramped = self._ramp_buf_i16[self.fade_done_samples : self.fade_done_samples + n]
 				outdata[samples_filled : samples_filled + n, 0] = ramped
-
-				try:
-					play_rms = float(np.sqrt(np.mean((ramped.astype(np.float32) / 32768.0) ** 2)))
-					self.recent_playback_rms = (
-						(1.0 - self._playback_rms_alpha) * self.recent_playback_rms
-						+ self._playback_rms_alpha * play_rms
-					)
-				except Exception:
-					pass
+				self._last_played = ramped
 
 				samples_filled += n
 				self.chunk_position += n
 				self.fade_done_samples += n
 
+			# Only zero what the fade didn't write.
+			if samples_filled < len(outdata):
+				outdata[samples_filled:] = 0
+
 			if self.fade_done_samples >= self.fade_total_samples:
+				self._slab_freed = self.current_audio_chunk[3]
 				self.current_audio_chunk = None
 				self.chunk_position = 0
-				while not self.output_queue.empty():
-					try:
-						self.output_queue.get_nowait()
-					except queue.Empty:
-						break
+				self._drop_queued_audio()
 				self.fading = False
 				self.prebuffering = True
+				self._last_sample = 0
 				self.interrupt_event.clear()
 			return
 
 		# Normal playback path
-		outdata.fill(0)
 		samples_filled = 0
 		while samples_filled < len(outdata):
 			if self.current_audio_chunk is None:
-				try:
-					if (
-						self.prebuffering
-						and self.output_queue.qsize() < self.prebuffer_target_chunks
-					):
-						break
-					self.prebuffering = False
-					self.current_audio_chunk = self.output_queue.get_nowait()
-					self.chunk_position = 0
-				except queue.Empty:
+				if self.prebuffering and not self._prebuffer_ready():
+					break
+				next_chunk = self.output_queue.pop()
+				if next_chunk is None:
 					break
+				self._dequeued_samples = next_chunk[4]
+				self.prebuffering = False
+				self.current_audio_chunk = next_chunk
+				self.chunk_position = 0
 
 			remaining_output = len(outdata) - samples_filled
-			samples, item_id, content_index = self.current_audio_chunk
+			samples = self.current_audio_chunk[0]
 			remaining_chunk = len(samples) - self.chunk_position
 			samples_to_copy = min(remaining_output, remaining_chunk)
 
@@ -773,20 +948,142 @@ class YuiRealtime:
 				outdata[samples_filled : samples_filled + samples_to_copy, 0] = chunk_data
 				samples_filled += samples_to_copy
 				self.chunk_position += samples_to_copy
-
-				try:
-					play_rms = float(np.sqrt(np.mean((chunk_data.astype(np.float32) / 32768.0) ** 2)))
-					self.recent_playback_rms = (
-						(1.0 - self._playback_rms_alpha) * self.recent_playback_rms
-						+ self._playback_rms_alpha * play_rms
-					)
-				except Exception:
-					pass
+				self._last_played = chunk_data
 
 				if self.chunk_position >= len(samples):
+					self._slab_freed = self.current_audio_chunk[3]
 					self.current_audio_chunk = None
 					self.chunk_position = 0
 
+		if samples_filled == len(outdata):
+			self._last_sample = outdata.item(len(outdata) - 1, 0)
+			return
+
+		# Ran out of audio mid-block.
+		if self.prebuffering:
+			outdata[samples_filled:] = 0
+			return
+		# We were playing: ramp down instead of stepping to zero, then rebuild
+		# the jitter buffer before resuming.
+		self._ramp_to_silence(outdata, samples_filled)
+		self.prebuffering = True
+		self._adapt_prebuffer(underrun=self._response_audio_pending)
+
+	def _adapt_prebuffer(self, underrun: bool) -> None:
+		"""Grow the prebuffer after an underrun; relax it after clean replies.
+
+		Called whenever playback runs dry. If the reply isn't finished this was a
+		genuine underrun, so buffer a little more next time. Otherwise the reply
+		ended; after PREBUFFER_DECAY_REPLIES in a row without an underrun, step
+		the target back toward the configured depth.
+		"""
+		step = max(self._prebuffer_target_samples // 10, SAMPLE_RATE // 100)
+		if underrun:
+			self._reply_underran = True
+			self._clean_replies = 0
+			self._prebuffer_target_samples = min(
+				self._prebuffer_max_samples, self._prebuffer_target_samples + step
+			)
+			return
+		if self._reply_underran:
+			self._reply_underran = False
+			return
+		self._clean_replies += 1
+		if self._clean_replies >= PREBUFFER_DECAY_REPLIES:
+			self._clean_replies = 0
+			self._prebuffer_target_samples = max(
+				self._prebuffer_base_samples, self._prebuffer_target_samples - step
+			)
+
+	def _ramp_to_silence(self, outdata, start: int) -> None:
+		"""Fill outdata[start:] with a short ramp from the last sample down to 0.
+
+		The ramp always reaches zero inside this block: when fewer than
+		UNDERRUN_RAMP_SAMPLES remain it is compressed to fit, since the next
+		callback is prebuffering and will only write silence.
+		"""
+		last = outdata.item(start - 1, 0) if start > 0 else self._last_sample
+		n = min(UNDERRUN_RAMP_SAMPLES, len(outdata) - start)
+		tail = self._buf_i32[:n]
+		if n == UNDERRUN_RAMP_SAMPLES:
+			np.multiply(self._underrun_ramp_q15, last, out=tail, dtype=np.int32)
+		else:
+			# gain[k] = 32767 - 32767 * (k + 1) // n, ending at exactly 0.
+			np.multiply(self._underrun_idx[:n], 32767, out=tail)
+			np.floor_divide(tail, n, out=tail)
+			np.subtract(32767, tail, out=tail)
+			np.multiply(tail, last, out=tail)
+		np.right_shift(tail, 15, out=tail)
+		outdata[start : start + n, 0] = tail
+		outdata[start + n :] = 0
+		self._last_sample = 0
+
+	def _render_fade_ramp(self, samples: np.ndarray, start: int, total: int) -> None:
+		"""Render the faded-out tail samples[start:start+total] into _ramp_buf_i16."""
+		if total <= 0:
+			return
+		acc = self._buf_i32[:total]
+		if total == self.fade_samples:
+			gain = self._fade_gain_q15[:total]
+		else:
+			# Chunk ends before a full fade: rescale the ramp over what's left,
+			# gain[i] = 32767 - 32767 * i // total.
+			gain = self._fade_gain_buf[:total]
+			np.multiply(self._fade_gain_idx[:total], 32767, out=acc)
+			np.floor_divide(acc, total, out=acc)
+			np.subtract(32767, acc, out=acc)
+			np.copyto(gain, acc, casting="unsafe")
+		if _fade_into_i16_jit is not None:
+			_fade_into_i16_jit(samples, start, gain, self._ramp_buf_i16, total)
+			return
+		np.multiply(samples[start : start + total], gain, out=acc, dtype=np.int32)
+		np.right_shift(acc, 15, out=acc)
+		np.copyto(self._ramp_buf_i16[:total], acc, casting="unsafe")
+
+	def _drop_queued_audio(self) -> None:
+		"""Consumer side: discard everything queued for playback."""
+		newest = self.output_queue.clear()
+		if newest is not None:
+			self._slab_freed = newest[3]
+			self._dequeued_samples = newest[4]
+
+	def _enqueue_audio(self, pcm: bytes, item_id: str, content_index: int) -> None:
+		"""Producer side: copy PCM into the playback arena and queue a view of it."""
+		src = np.frombuffer(pcm, dtype=np.int16)
+		n = len(src)
+		if n == 0:
+			return
+		slab_len = len(self._audio_slab)
+		off = self._slab_alloc % slab_len
+		# Never split a chunk across the wrap point; skip the slab's tail instead.
+		skip = slab_len - off if off + n > slab_len else 0
+		if self._slab_alloc + skip + n - self._slab_freed <= slab_len:
+			self._slab_alloc += skip
+			off = self._slab_alloc % slab_len
+			samples = self._audio_slab[off : off + n]
+			np.copyto(samples, src)
+			self._slab_alloc += n
+		else:
+			# Server is more than AUDIO_SLAB_S ahead of playback; give this
+			# chunk its own buffer rather than overwrite unplayed audio.
+			samples = src.copy()
+		queued_mark = self._queued_samples + n
+		if self.output_queue.push(
+			(samples, item_id, content_index, self._slab_alloc, queued_mark)
+		):
+			self._queued_samples = queued_mark
+		elif not self._output_overflow_warned:
+			self._output_overflow_warned = True
+			print("⚠️  Playback buffer full; dropping assistant audio", file=sys.stderr)
+
+	def _prebuffer_ready(self) -> bool:
+		"""True once enough samples are queued to start playback without underrunning."""
+		buffered = self._queued_samples - self._dequeued_samples
+		if buffered >= self._prebuffer_target_samples:
+			return True
+		# A reply shorter than the prebuffer would otherwise never start.
+		return buffered > 0 and not self._response_audio_pending
+
 	# ---------- WebSocket send helpers ----------
 
 	async def _send(self, event: dict[str, Any]) -> None:
@@ -877,7 +1174,7 @@ class YuiRealtime:
 		}
 		await self._send({"type": "session.update", "session": session})
 
-	async def _send_audio_chunk(self, audio_bytes: bytes) -> None:
+	async def _send_audio_chunk(self, audio_bytes: "bytes | memoryview") -> None:
 		await self._send(
 			{
 				"type": "input_audio_buffer.append",
@@ -885,6 +1182,80 @@ class YuiRealtime:
 			}
 		)
 
+	def _queue_send(self, item: Any) -> None:
+		"""Hand mic audio (or None for a turn commit) to the sender task."""
+		if item is not None:
+			if self._send_audio_queued >= MIC_SEND_QUEUE_MAX:
+				# Network stalled; drop the oldest audio rather than block capture.
+				self._evict_oldest_audio()
+				if not self._send_drop_warned:
+					self._send_drop_warned = True
+					print("⚠️  WebSocket send backlog; dropping oldest mic audio", file=sys.stderr)
+			self._send_audio_queued += 1
+		self._send_q.put_nowait(item)
+
+	def _evict_oldest_audio(self) -> None:
+		"""Remove the oldest queued audio send, keeping every commit in order."""
+		pending = []
+		while not self._send_q.empty():
+			pending.append(self._send_q.get_nowait())
+		evicted = False
+		for item in pending:
+			if not evicted and item is not None:
+				evicted = True
+				self._send_audio_queued -= 1
+				continue
+			self._send_q.put_nowait(item)
+
+	def _queue_audio(self, audio_bytes: "bytes | memoryview", immediate: bool = False) -> None:
+		"""Batch mic frames into fewer, larger sends.
+
+		Pass immediate=True while the assistant is speaking so barge-in audio
+		reaches the server without waiting for the batch to fill.
+		"""
+		self._mic_batch.append(audio_bytes)
+		if immediate or len(self._mic_batch) >= MIC_SEND_BATCH_FRAMES:
+			self._flush_mic_batch()
+
+	def _flush_mic_batch(self) -> None:
+		if not self._mic_batch:
+			return
+		batch = self._mic_batch
+		self._mic_batch = []
+		self._queue_send(batch[0] if len(batch) == 1 else b"".join(batch))
+
+	def _queue_commit(self) -> None:
+		self._flush_mic_batch()
+		self._queue_send(None)
+
+	def _drop_queued_sends(self) -> None:
+		self._mic_batch = []
+		while not self._send_q.empty():
+			self._send_q.get_nowait()
+		self._send_audio_queued = 0
+
+	async def _audio_sender_loop(self) -> None:
+		"""Drain queued mic audio and turn commits to the WebSocket, in order.
+
+		Runs until cancelled by run() on shutdown. A closed connection stops
+		recording; any other send failure is logged and the loop carries on.
+		"""
+		while True:
+			item = await self._send_q.get()
+			if item is not None:
+				self._send_audio_queued -= 1
+			try:
+				if item is None:
+					await self._commit_and_respond()
+				else:
+					await self._send_audio_chunk(item)
+			except websockets.exceptions.ConnectionClosed as e:
+				print(f"Audio send error: connection closed ({e})")
+				self.recording = False
+				return
+			except Exception as e:
+				print(f"Audio send error: {_truncate_str(str(e), 200)}")
+
 	async def _commit_and_respond(self) -> None:
 		# Manual turn boundary used by RMS-mode barge-in/end-of-utterance triggers.
 		await self._send({"type": "input_audio_buffer.commit"})
@@ -1017,6 +1388,7 @@ class YuiRealtime:
 		print("💤 Sleeping (say the wake word again)")
 		# Stop any in-flight assistant audio and clear local + server buffers.
 		self.interrupt_event.set()
+		self._drop_queued_sends()
 		await self._cancel_response()
 		await self._send({"type": "input_audio_buffer.clear"})
 		if self.wake_model is not None:
@@ -1072,13 +1444,12 @@ class YuiRealtime:
 
 		self._load_wake_model()
 
-		chunk_size = int(SAMPLE_RATE * CHUNK_LENGTH_S)
 		self.audio_player = sd.OutputStream(
 			channels=CHANNELS,
 			samplerate=SAMPLE_RATE,
 			dtype=FORMAT,
 			callback=self._output_callback,
-			blocksize=chunk_size,
+			blocksize=self.blocksize,
 		)
 		self.audio_player.start()
 
@@ -1104,6 +1475,8 @@ class YuiRealtime:
 					await self._on_event(event)
 		finally:
 			self.recording = False
+			if self._sender_task is not None:
+				self._sender_task.cancel()
 			if self.audio_player and self.audio_player.active:
 				self.audio_player.stop()
 			if self.audio_player:
@@ -1112,15 +1485,42 @@ class YuiRealtime:
 
 	# ---------- Audio capture ----------
 
+	def _input_callback(self, indata, frames: int, time, status) -> None:
+		if status:
+			print(f"Input callback status: {status}")
+		# sounddevice reuses indata after we return, so queue a copy. If capture
+		# has fallen a full ring behind, drop the block rather than block here.
+		if self._mic_ring.push(indata.copy()) and self._loop is not None:
+			try:
+				self._loop.call_soon_threadsafe(self._mic_event.set)
+			except RuntimeError:
+				# Event loop already closed during shutdown.
+				pass
+
+	async def _mic_frames(self):
+		"""Yield captured mic blocks as the input callback delivers them."""
+		while self.recording:
+			await self._mic_event.wait()
+			self._mic_event.clear()
+			while True:
+				data = self._mic_ring.pop()
+				if data is None:
+					break
+				yield data
+
 	async def start_audio_recording(self) -> None:
+		self._loop = asyncio.get_running_loop()
 		self.audio_stream = sd.InputStream(
 			channels=CHANNELS,
 			samplerate=SAMPLE_RATE,
 			dtype=FORMAT,
+			blocksize=int(SAMPLE_RATE * CHUNK_LENGTH_S),
+			callback=self._input_callback,
 		)
 		self.audio_stream.start()
 		self.recording = True
 		asyncio.create_task(self.capture_audio())
+		self._sender_task = asyncio.create_task(self._audio_sender_loop())
 
 	async def _keyboard_interrupt_listener(self) -> None:
 		"""Listen for Enter key to trigger manual barge-in."""
@@ -1141,18 +1541,21 @@ class YuiRealtime:
 			except Exception:
 				await asyncio.sleep(0.1)
 
+	def _update_playback_energy(self) -> None:
+		"""Fold the most recently played block into the playback energy average."""
+		played = self._last_played
+		if played is None or played.size == 0:
+			return
+		self._last_played = None
+		new_q16 = (_ssq_i16(played) << 16) // played.size
+		self.recent_playback_ms_q16 += (
+			new_q16 - self.recent_playback_ms_q16
+		) >> self._playback_ms_shift
+
 	async def capture_audio(self) -> None:
 		if not self.audio_stream or not self.ws:
 			return
 
-		read_size = int(SAMPLE_RATE * CHUNK_LENGTH_S)
-
-		def rms_energy(samples: np.ndarray) -> float:
-			if samples.size == 0:
-				return 0.0
-			x = samples.astype(np.float32) / 32768.0
-			return float(np.sqrt(np.mean(x * x)))
-
 		# Track whether we've sent any audio in the current user turn (rms mode)
 		turn_has_audio = False
 		silence_chunks = 0
@@ -1166,19 +1569,18 @@ class YuiRealtime:
 		)
 
 		try:
-			while self.recording:
-				if self.audio_stream.read_available < read_size:
-					await asyncio.sleep(0.01)
-					continue
-
-				data, _ = self.audio_stream.read(read_size)
-				audio_bytes = data.tobytes()
+			async for data in self._mic_frames():
+				# Each block is a private copy from _input_callback, so a
+				# zero-copy byte view stays valid for as long as we hold it.
+				audio_bytes = memoryview(data).cast("B")
 
 				assistant_playing = (
 					self.current_audio_chunk is not None or not self.output_queue.empty()
 				)
 				samples = data.reshape(-1)
-				mic_rms = rms_energy(samples)
+				mic_ssq_q16 = _ssq_i16(samples) << 16
+				mic_loud = mic_ssq_q16 >= _ENERGY_THRESHOLD_MS_Q16 * samples.size
+				self._update_playback_energy()
 
 				# ----- Wake-word gating -----
 				if not self.awake:
@@ -1192,7 +1594,7 @@ class YuiRealtime:
 					continue
 
 				# Track speech activity so we can sleep on prolonged silence.
-				if mic_rms >= ENERGY_THRESHOLD or assistant_playing:
+				if mic_loud or assistant_playing:
 					self.last_speech_at = time.monotonic()
 				elif (
 					self.wake_word_model_path is not None
@@ -1207,8 +1609,8 @@ class YuiRealtime:
 
 				if self.barge_in_mode == "server":
 					# Stream constantly; server_vad handles turn detection + interruption.
-					self.vad_active_frames = 0
-					await self._send_audio_chunk(audio_bytes)
+					self.vad_window = 0
+					self._queue_audio(audio_bytes, immediate=assistant_playing)
 				else:
 					# Local RMS-based turn-taking with echo suppression.
 					if assistant_playing:
@@ -1216,28 +1618,29 @@ class YuiRealtime:
 							self.interrupt_event.set()
 							self.force_barge_in = False
 							await self._cancel_response()
-							await self._send_audio_chunk(audio_bytes)
+							self._queue_audio(audio_bytes, immediate=True)
 							turn_has_audio = True
 							silence_chunks = 0
 							await asyncio.sleep(0)
 							continue
-						playback_guard = max(
-							ENERGY_THRESHOLD, self.recent_playback_rms * ECHO_SUPPRESS_MULTIPLIER
+						playback_guard_q16 = max(
+							_ENERGY_THRESHOLD_MS_Q16,
+							(self.recent_playback_ms_q16 * _ECHO_SUPPRESS_GAIN_Q8) >> 8,
 						)
-						if mic_rms >= playback_guard:
-							self.vad_active_frames += 1
-							if self.vad_active_frames >= BARGE_IN_FRAMES_REQUIRED:
-								self.interrupt_event.set()
-								await self._cancel_response()
-								await self._send_audio_chunk(audio_bytes)
-								turn_has_audio = True
-								silence_chunks = 0
-						else:
-							self.vad_active_frames = 0
+						above = mic_ssq_q16 >= playback_guard_q16 * samples.size
+						self.vad_window = (
+							(self.vad_window << 1) | above
+						) & _BARGE_IN_WINDOW_MASK
+						if above and self.vad_window.bit_count() >= BARGE_IN_FRAMES_REQUIRED:
+							self.interrupt_event.set()
+							await self._cancel_response()
+							self._queue_audio(audio_bytes, immediate=True)
+							turn_has_audio = True
+							silence_chunks = 0
 					else:
-						self.vad_active_frames = 0
-						if mic_rms >= ENERGY_THRESHOLD:
-							await self._send_audio_chunk(audio_bytes)
+						self.vad_window = 0
+						if mic_loud:
+							self._queue_audio(audio_bytes)
 							turn_has_audio = True
 							speech_chunks += 1
 							silence_chunks = 0
@@ -1246,13 +1649,13 @@ class YuiRealtime:
 							# last word; commit only after enough quiet AND a
 							# minimum amount of actual speech (to avoid spurious
 							# commits on stray noise).
-							await self._send_audio_chunk(audio_bytes)
+							self._queue_audio(audio_bytes)
 							silence_chunks += 1
 							if (
 								silence_chunks >= end_of_utterance_chunks
 								and speech_chunks >= min_utterance_chunks
 							):
-								await self._commit_and_respond()
+								self._queue_commit()
 								turn_has_audio = False
 								silence_chunks = 0
 								speech_chunks = 0
@@ -1291,12 +1694,12 @@ class YuiRealtime:
 				if not audio_b64:
 					return
 				pcm = base64.b64decode(audio_b64)
-				np_audio = np.frombuffer(pcm, dtype=np.int16)
 				item_id = event.get("item_id", self.active_item_id)
 				content_index = int(event.get("content_index", self.active_content_index))
-				self.output_queue.put_nowait((np_audio, item_id, content_index))
+				self._response_audio_pending = True
+				self._enqueue_audio(pcm, item_id, content_index)
 			elif etype == "response.output_audio.done":
-				pass
+				self._response_audio_pending = False
 			elif etype == "response.audio_transcript.delta" or etype == "response.output_audio_transcript.delta":
 				if not self.awake:
 					return
@@ -1325,6 +1728,7 @@ class YuiRealtime:
 				await self._handle_function_call(event)
 			elif etype == "response.done":
 				self.active_response_id = None
+				self._response_audio_pending = False
 				usage = ((event.get("response") or {}).get("usage")) or event.get("usage")
 				if usage:
 					print(
@@ -1394,6 +1798,8 @@ async def main():
 	greet_on_wake = True
 	memory_path = DEFAULT_MEMORY_PATH
 	silence_ms = DEFAULT_SILENCE_MS
+	block_ms = AUDIO_BLOCKSIZE_MS
+	prebuffer_ms = PREBUFFER_MS
 	i = 0
 	while i < len(args):
 		if args[i] == "--system-prompt" and i + 1 < len(args):
@@ -1429,6 +1835,12 @@ async def main():
 		elif args[i] == "--silence-ms" and i + 1 < len(args):
 			silence_ms = int(args[i + 1])
 			i += 2
+		elif args[i] == "--block-ms" and i + 1 < len(args):
+			block_ms = float(args[i + 1])
+			i += 2
+		elif args[i] == "--latency-ms" and i + 1 < len(args):
+			prebuffer_ms = float(args[i + 1])
+			i += 2
 		elif args[i] in ("--help", "-h"):
 			print(
 				"""
@@ -1450,6 +1862,10 @@ Options:
   --silence-ms N               Silence (ms) after speech that ends a turn
                                (default 750; raise if she cuts you off,
                                lower if she feels slow to respond)
+  --block-ms N                 Speaker callback block size in ms (default 40,
+                               60 on Windows; env AUDIO_BLOCKSIZE_MS)
+  --latency-ms N               Assistant audio buffered before playback starts
+                               (default 120; raise if playback crackles)
 
 Environment:
   XAI_API_KEY                  Required
@@ -1477,6 +1893,8 @@ Environment:
 		sleep_after_s=sleep_after_s,
 		greet_on_wake=greet_on_wake,
 		silence_ms=silence_ms,
+		block_ms=block_ms,
+		prebuffer_ms=prebuffer_ms,
 	)
 	await demo.run()
 